@@ -1,26 +1,362 @@
+import asyncio
+import functools
+import hashlib
+import inspect
 import pandas as pd
-import requests
+import httpx
+import sqlite3
 import time
 import json
 from urllib.parse import quote
 import logging
 from typing import Dict, List, Optional, Tuple
 import re
+from types import MappingProxyType
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Heritage regions by country Q-ID (simplified): (Q-ID, region, country)
+_HERITAGE_RAW: List[Tuple[str, str, str]] = [
+    # Europe
+    ('Q142', 'European', 'France'),
+    ('Q183', 'European', 'Germany'),
+    ('Q38', 'European', 'Italy'),
+    ('Q29', 'European', 'Spain'),
+    ('Q145', 'European', 'United Kingdom'),
+    ('Q34', 'European', 'Sweden'),
+    ('Q35', 'European', 'Denmark'),
+    ('Q55', 'European', 'Netherlands'),
+    ('Q40', 'European', 'Austria'),
+    ('Q39', 'European', 'Switzerland'),
+    ('Q36', 'European', 'Poland'),
+    ('Q37', 'European', 'Lithuania'),
+    ('Q33', 'European', 'Finland'),
+    ('Q20', 'European', 'Norway'),
+    ('Q159', 'European', 'Russia'),
+    
+    # North America
+    ('Q30', 'North American', 'United States'),
+    ('Q16', 'North American', 'Canada'),
+    ('Q96', 'North American', 'Mexico'),
+    
+    # Asia
+    ('Q148', 'East Asian', 'China'),
+    ('Q17', 'East Asian', 'Japan'),
+    ('Q884', 'East Asian', 'South Korea'),
+    ('Q668', 'South Asian', 'India'),
+    ('Q334', 'Southeast Asian', 'Singapore'),
+    ('Q833', 'Southeast Asian', 'Malaysia'),
+    ('Q928', 'Southeast Asian', 'Philippines'),
+    ('Q252', 'Southeast Asian', 'Indonesia'),
+    ('Q869', 'Southeast Asian', 'Thailand'),
+    ('Q881', 'Southeast Asian', 'Vietnam'),
+    ('Q889', 'South Asian', 'Afghanistan'),
+    ('Q843', 'South Asian', 'Pakistan'),
+    ('Q902', 'South Asian', 'Bangladesh'),
+    ('Q424', 'Southeast Asian', 'Cambodia'),
+    ('Q819', 'Southeast Asian', 'Laos'),
+    ('Q836', 'Southeast Asian', 'Myanmar'),
+    ('Q878', 'Middle Eastern', 'United Arab Emirates'),
+    ('Q858', 'Middle Eastern', 'Syria'),
+    ('Q796', 'Middle Eastern', 'Iraq'),
+    ('Q794', 'Middle Eastern', 'Iran'),
+    ('Q801', 'Middle Eastern', 'Israel'),
+    ('Q822', 'Middle Eastern', 'Lebanon'),
+    
+    # Africa
+    ('Q258', 'African', 'South Africa'),
+    ('Q1033', 'African', 'Nigeria'),
+    ('Q1028', 'African', 'Morocco'),
+    ('Q79', 'African', 'Egypt'),
+    ('Q1049', 'African', 'Sudan'),
+    ('Q1016', 'African', 'Libya'),
+    ('Q1050', 'African', 'Eswatini'),
+    ('Q1037', 'African', 'Rwanda'),
+    ('Q1036', 'African', 'Uganda'),
+    ('Q1019', 'African', 'Madagascar'),
+    ('Q1020', 'African', 'Malawi'),
+    ('Q1041', 'African', 'Senegal'),
+    ('Q1008', 'African', 'Ivory Coast'),
+    ('Q1032', 'African', 'Niger'),
+    ('Q1025', 'African', 'Mauritania'),
+    ('Q1044', 'African', 'Sierra Leone'),
+    ('Q1009', 'African', 'Cameroon'),
+    ('Q929', 'African', 'Central African Republic'),
+    ('Q965', 'African', 'Burkina Faso'),
+    ('Q967', 'African', 'Burundi'),
+    ('Q1011', 'African', 'Cape Verde'),
+    ('Q977', 'African', 'Djibouti'),
+    ('Q983', 'African', 'Equatorial Guinea'),
+    ('Q986', 'African', 'Eritrea'),
+    ('Q115', 'African', 'Ethiopia'),
+    ('Q1000', 'African', 'Gabon'),
+    ('Q1005', 'African', 'Gambia'),
+    ('Q117', 'African', 'Ghana'),
+    ('Q1006', 'African', 'Guinea'),
+    ('Q1007', 'African', 'Guinea-Bissau'),
+    ('Q114', 'African', 'Kenya'),
+    ('Q1013', 'African', 'Lesotho'),
+    ('Q1014', 'African', 'Liberia'),
+    ('Q912', 'African', 'Mali'),
+    ('Q1027', 'African', 'Mauritius'),
+    ('Q1029', 'African', 'Mozambique'),
+    ('Q1030', 'African', 'Namibia'),
+    ('Q971', 'African', 'Republic of the Congo'),
+    ('Q1039', 'African', 'São Tomé and Príncipe'),
+    ('Q1045', 'African', 'Somalia'),
+    ('Q958', 'African', 'South Sudan'),
+    ('Q924', 'African', 'Tanzania'),
+    ('Q945', 'African', 'Togo'),
+    ('Q948', 'African', 'Tunisia'),
+    ('Q953', 'African', 'Zambia'),
+    ('Q954', 'African', 'Zimbabwe'),
+    
+    # Latin America
+    ('Q414', 'Latin American', 'Argentina'),
+    ('Q155', 'Latin American', 'Brazil'),
+    ('Q298', 'Latin American', 'Chile'),
+    ('Q739', 'Latin American', 'Colombia'),
+    ('Q241', 'Latin American', 'Cuba'),
+    ('Q736', 'Latin American', 'Ecuador'),
+    ('Q804', 'Latin American', 'Panama'),
+    ('Q717', 'Latin American', 'Venezuela'),
+    ('Q750', 'Latin American', 'Bolivia'),
+    ('Q733', 'Latin American', 'Paraguay'),
+    ('Q77', 'Latin American', 'Uruguay'),
+    ('Q419', 'Latin American', 'Peru'),
+    ('Q774', 'Latin American', 'Guatemala'),
+    ('Q783', 'Latin American', 'Honduras'),
+    ('Q792', 'Latin American', 'El Salvador'),
+    ('Q811', 'Latin American', 'Nicaragua'),
+    ('Q800', 'Latin American', 'Costa Rica'),
+    ('Q790', 'Latin American', 'Haiti'),
+    ('Q786', 'Latin American', 'Dominican Republic'),
+    ('Q766', 'Latin American', 'Jamaica'),
+    ('Q757', 'Latin American', 'Saint Vincent and the Grenadines'),
+    ('Q760', 'Latin American', 'Saint Lucia'),
+    ('Q769', 'Latin American', 'Grenada'),
+    ('Q784', 'Latin American', 'Dominica'),
+    ('Q781', 'Latin American', 'Antigua and Barbuda'),
+    ('Q778', 'Latin American', 'Bahamas'),
+    ('Q244', 'Latin American', 'Barbados'),
+    ('Q242', 'Latin American', 'Belize'),
+    ('Q734', 'Latin American', 'Guyana'),
+    ('Q730', 'Latin American', 'Suriname'),
+    ('Q754', 'Latin American', 'Trinidad and Tobago'),
+]
+
+def _build_heritage_mappings(raw: List[Tuple[str, str, str]]) -> MappingProxyType:
+    """Build the Q-ID -> region lookup, refusing duplicate Q-IDs"""
+    mappings: Dict[str, str] = {}
+    for qid, region, country in raw:
+        if qid in mappings:
+            raise ValueError(f"Duplicate heritage mapping for {qid} ({country})")
+        mappings[qid] = region
+    return MappingProxyType(mappings)
+
+HERITAGE_MAPPINGS = _build_heritage_mappings(_HERITAGE_RAW)
+
+# Patterns used by clean_artist_name, compiled once
+_WHITESPACE = re.compile(r'\s+')
+_SUFFIXES = re.compile(r'(?:,\s*|\s+)(?:Jr\.|Sr\.|III|II|IV)(?!\w)')
+
+def escape_sparql_string(value: str) -> str:
+    """Escape a value for use inside a double-quoted SPARQL string literal"""
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+def escape_cql_string(value: str) -> str:
+    """Escape a value for use inside a double-quoted CQL search term"""
+    return re.sub(r'([\\"*?^])', r'\\\1', value)
+
+class ResponseCache:
+    """
+    Persistent SQLite cache for enrichment lookups, shared safely between
+    processes. Keys are prefixed with a schema version so that changing the
+    shape of cached records invalidates old entries.
+    """
+    
+    SCHEMA_VERSION = 2
+    
+    def __init__(self, path: str, ttl_days: float = 30, negative_ttl_days: float = 1):
+        self.path = path
+        self.ttl_seconds = ttl_days * 86400
+        # "Not found" results expire sooner, as the artist may be added upstream later
+        self.negative_ttl_seconds = negative_ttl_days * 86400
+        self._conn = sqlite3.connect(path, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+        )
+        self._conn.commit()
+    
+    def make_key(self, *parts) -> str:
+        """Hash the lookup parameters into a versioned cache key"""
+        digest = hashlib.blake2b(json.dumps(parts, default=str).encode('utf-8'),
+                                 digest_size=16).hexdigest()
+        return f"v{self.SCHEMA_VERSION}:{digest}"
+    
+    def get(self, key: str) -> Tuple[bool, Optional[Dict]]:
+        """Return (hit, value) for a key, ignoring expired entries"""
+        row = self._conn.execute(
+            "SELECT value FROM responses WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, json.loads(row[0])
+    
+    def set(self, key: str, value: Optional[Dict]):
+        """Store a lookup result, including negative (None) results"""
+        ttl = self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        self._conn.execute(
+            "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+        self._conn.commit()
+    
+    def close(self):
+        self._conn.close()
+
+class RequestFailed(Exception):
+    """
+    An HTTP request to a linked data service did not return a usable response.
+    `rejected` is True when the service refused this particular request (a 4xx
+    or a query timeout), as opposed to being unavailable or rate-limiting us.
+    """
+    
+    def __init__(self, message: str, rejected: bool = False):
+        super().__init__(message)
+        self.rejected = rejected
+
+def _normalise_lookup_arg(value):
+    """Normalise a lookup argument: nulls become None and whole numbers (e.g. np.int64) become int"""
+    if value is None or (pd.api.types.is_scalar(value) and pd.isna(value)):
+        return None
+    if pd.api.types.is_integer(value) or (pd.api.types.is_float(value) and float(value).is_integer()):
+        return int(value)
+    return value
+
+def cached_lookup(source: str):
+    """
+    Cache an async lookup method on (source, cleaned name, other arguments)
+    in the pipeline's ResponseCache, if one is configured. A lookup that
+    raises is logged and returns None, and is never cached.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        
+        @functools.wraps(func)
+        async def wrapper(self, artist_name, *args, **kwargs):
+            key = None
+            if self.cache is not None:
+                try:
+                    bound = signature.bind(self, artist_name, *args, **kwargs)
+                    bound.apply_defaults()
+                    extra = [_normalise_lookup_arg(value) for name, value in bound.arguments.items()
+                             if name not in ('self', 'artist_name')]
+                    key = self.cache.make_key(source, self.clean_artist_name(artist_name), *extra)
+                    
+                    hit, value = self.cache.get(key)
+                    if hit:
+                        return value
+                except Exception as e:
+                    # A cache problem shouldn't stop the lookup itself
+                    logger.warning(f"Cache lookup failed for {source} {artist_name}: {str(e)}")
+                    key = None
+            
+            try:
+                value = await func(self, artist_name, *args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error querying {source} for {artist_name}: {str(e)}")
+                return None
+            
+            if key is not None:
+                try:
+                    self.cache.set(key, value)
+                except Exception as e:
+                    logger.warning(f"Failed to cache {source} result for {artist_name}: {str(e)}")
+            return value
+        return wrapper
+    return decorator
+
+class RateLimiter:
+    """
+    Token-bucket rate limiter for async HTTP requests. Allows short bursts of
+    up to `capacity` requests, refilling at `rate` tokens per second. A rate
+    of None disables throttling, though pauses are still honoured.
+    """
+    
+    def __init__(self, rate: Optional[float], capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._resume_at = 0.0
+        self._lock = asyncio.Lock()
+    
+    def pause(self, seconds: float):
+        """Hold back all further requests for `seconds`, e.g. after an HTTP 429"""
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+    
+    async def acquire(self):
+        """Wait until a token is available, then consume it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._resume_at:
+                    await asyncio.sleep(self._resume_at - now)
+                    continue
+                
+                if self.rate is None:
+                    return
+                
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
 class ArtistEnrichmentPipeline:
     """
     A pipeline for enriching museum artist data with gender and heritage information
     from various linked open data sources.
     """
     
-    def __init__(self, delay_seconds: float = 1.0):
+    def __init__(self, delay_seconds: float = 1.0, max_concurrency: int = 8,
+                 max_requests_per_second: Optional[float] = None, batch_size: int = 50,
+                 cache_path: Optional[str] = 'enrichment_cache.sqlite3', max_retries: int = 3,
+                 rate_limit_sleep_seconds: float = 15.0):
         self.delay_seconds = delay_seconds
+        # Transient failures (timeouts, 5xx, 429) are retried with backoff
+        self.max_retries = max_retries
+        # Pause after a 429 that carries no usable Retry-After header
+        self.rate_limit_sleep_seconds = rate_limit_sleep_seconds
+        # Persistent response cache; pass cache_path=None to always hit the network
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self.max_concurrency = max_concurrency
+        # Names per VALUES query; keeps each batch well inside the WDQS 60s budget
+        self.batch_size = batch_size
+        # Sustained request rate; defaults to one request per `delay_seconds`.
+        # A non-positive delay or rate means no throttling (None)
+        if max_requests_per_second is None and delay_seconds > 0:
+            max_requests_per_second = 1.0 / delay_seconds
+        if max_requests_per_second is not None and max_requests_per_second <= 0:
+            max_requests_per_second = None
+        self.max_requests_per_second = max_requests_per_second
+        # Concurrency and rate limits, bound to the event loop they were created on
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._rate_limiter: Optional[RateLimiter] = None
+        self._throttle_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Shared HTTP/2 client, created on first use; see `client`
+        self._client: Optional[httpx.AsyncClient] = None
         self.wikidata_endpoint = "https://query.wikidata.org/sparql"
-        self.viaf_endpoint = "http://viaf.org/viaf/search"
+        self.viaf_endpoint = "https://viaf.org/viaf/search"
         
         # Gender mappings
         self.gender_mappings = {
@@ -31,137 +367,8 @@ class ArtistEnrichmentPipeline:
             'Q2449503': 'Non-Binary',  # Transgender
         }
         
-        # Heritage region mappings (simplified)
-        self.heritage_mappings = {
-            # Europe
-            'Q142': 'European',  # France
-            'Q183': 'European',  # Germany
-            'Q38': 'European',   # Italy
-            'Q29': 'European',   # Spain
-            'Q145': 'European',  # United Kingdom
-            'Q34': 'European',   # Sweden
-            'Q35': 'European',   # Denmark
-            'Q55': 'European',   # Netherlands
-            'Q40': 'European',   # Austria
-            'Q39': 'European',   # Switzerland
-            'Q36': 'European',   # Poland
-            'Q37': 'European',   # Lithuania
-            'Q33': 'European',   # Finland
-            'Q20': 'European',   # Norway
-            'Q159': 'European',  # Russia
-            
-            # North America
-            'Q30': 'North American',    # United States
-            'Q16': 'North American',    # Canada
-            'Q96': 'North American',    # Mexico
-            
-            # Asia
-            'Q148': 'East Asian',       # China
-            'Q17': 'East Asian',        # Japan
-            'Q884': 'East Asian',       # South Korea
-            'Q668': 'South Asian',      # India
-            'Q819': 'South Asian',      # Laos
-            'Q334': 'Southeast Asian',  # Singapore
-            'Q833': 'Southeast Asian',  # Malaysia
-            'Q928': 'Southeast Asian',  # Philippines
-            'Q252': 'Southeast Asian',  # Indonesia
-            'Q869': 'Southeast Asian',  # Thailand
-            'Q881': 'Southeast Asian',  # Vietnam
-            'Q889': 'South Asian',      # Afghanistan
-            'Q843': 'South Asian',      # Pakistan
-            'Q902': 'South Asian',      # Bangladesh
-            'Q424': 'Southeast Asian',  # Cambodia
-            'Q819': 'Southeast Asian',  # Laos
-            'Q836': 'Southeast Asian',  # Myanmar
-            'Q878': 'Middle Eastern',   # United Arab Emirates
-            'Q858': 'Middle Eastern',   # Syria
-            'Q796': 'Middle Eastern',   # Iraq
-            'Q794': 'Middle Eastern',   # Iran
-            'Q801': 'Middle Eastern',   # Israel
-            'Q822': 'Middle Eastern',   # Lebanon
-            'Q199': 'European',         # 1
-            
-            # Africa
-            'Q258': 'African',          # South Africa
-            'Q1033': 'African',         # Nigeria
-            'Q1028': 'African',         # Morocco
-            'Q79': 'African',           # Egypt
-            'Q1049': 'African',         # Sudan
-            'Q1014': 'African',         # Libya
-            'Q1029': 'African',         # Morocco
-            'Q1050': 'African',         # Swaziland
-            'Q1037': 'African',         # Rwanda
-            'Q1036': 'African',         # Uganda
-            'Q1019': 'African',         # Madagascar
-            'Q1020': 'African',         # Malawi
-            'Q1041': 'African',         # Senegal
-            'Q1008': 'African',         # Ivory Coast
-            'Q1032': 'African',         # Niger
-            'Q1027': 'African',         # Mauritania
-            'Q1042': 'African',         # Sierra Leone
-            'Q1009': 'African',         # Cameroon
-            'Q1007': 'African',         # Central African Republic
-            'Q1006': 'African',         # Burkina Faso
-            'Q1005': 'African',         # Burundi
-            'Q1011': 'African',         # Cape Verde
-            'Q1013': 'African',         # Djibouti
-            'Q1017': 'African',         # Equatorial Guinea
-            'Q1018': 'African',         # Eritrea
-            'Q115': 'African',          # Ethiopia
-            'Q1000': 'African',         # Gabon
-            'Q1005': 'African',         # Gambia
-            'Q117': 'African',          # Ghana
-            'Q1007': 'African',         # Guinea
-            'Q1008': 'African',         # Guinea-Bissau
-            'Q1028': 'African',         # Kenya
-            'Q1013': 'African',         # Lesotho
-            'Q1014': 'African',         # Liberia
-            'Q1016': 'African',         # Mali
-            'Q1027': 'African',         # Mauritius
-            'Q1020': 'African',         # Mozambique
-            'Q1030': 'African',         # Namibia
-            'Q1032': 'African',         # Republic of the Congo
-            'Q1039': 'African',         # São Tomé and Príncipe
-            'Q1044': 'African',         # Somalia
-            'Q1045': 'African',         # South Sudan
-            'Q1046': 'African',         # Tanzania
-            'Q1007': 'African',         # Togo
-            'Q1048': 'African',         # Tunisia
-            'Q1049': 'African',         # Zambia
-            'Q954': 'African',          # Zimbabwe
-            
-            # Latin America
-            'Q414': 'Latin American',   # Argentina
-            'Q155': 'Latin American',   # Brazil
-            'Q298': 'Latin American',   # Chile
-            'Q739': 'Latin American',   # Colombia
-            'Q241': 'Latin American',   # Cuba
-            'Q736': 'Latin American',   # Ecuador
-            'Q804': 'Latin American',   # Panama
-            'Q717': 'Latin American',   # Venezuela
-            'Q750': 'Latin American',   # Bolivia
-            'Q733': 'Latin American',   # Paraguay
-            'Q77': 'Latin American',    # Uruguay
-            'Q419': 'Latin American',   # Guatemala
-            'Q774': 'Latin American',   # Honduras
-            'Q792': 'Latin American',   # El Salvador
-            'Q811': 'Latin American',   # Nicaragua
-            'Q800': 'Latin American',   # Costa Rica
-            'Q790': 'Latin American',   # Haiti
-            'Q786': 'Latin American',   # Dominican Republic
-            'Q766': 'Latin American',   # Jamaica
-            'Q757': 'Latin American',   # Saint Vincent and the Grenadines
-            'Q760': 'Latin American',   # Saint Lucia
-            'Q769': 'Latin American',   # Grenada
-            'Q784': 'Latin American',   # Dominica
-            'Q781': 'Latin American',   # Antigua and Barbuda
-            'Q778': 'Latin American',   # Bahamas
-            'Q244': 'Latin American',   # Barbados
-            'Q242': 'Latin American',   # Belize
-            'Q734': 'Latin American',   # Guyana
-            'Q730': 'Latin American',   # Suriname
-            'Q18': 'Latin American',    # Trinidad and Tobago
-        }
+        # Heritage region mappings, shared by all pipeline instances
+        self.heritage_mappings = HERITAGE_MAPPINGS
     
     def clean_artist_name(self, name: str) -> str:
         """Clean and standardize artist names"""
@@ -169,118 +376,387 @@ class ArtistEnrichmentPipeline:
             return ""
         
         # Remove extra whitespace
-        name = re.sub(r'\s+', ' ', name.strip())
+        name = _WHITESPACE.sub(' ', name.strip())
         
-        # Handle "Last, First" format
-        if ',' in name:
-            parts = name.split(',')
-            if len(parts) == 2:
-                last, first = parts
-                name = f"{first.strip()} {last.strip()}"
+        # Remove common suffixes, including "Name, Jr." so it isn't mistaken for "Last, First"
+        name = _SUFFIXES.sub('', name).strip()
         
-        # Remove common suffixes
-        suffixes = ['Jr.', 'Sr.', 'III', 'II', 'IV']
-        for suffix in suffixes:
-            name = name.replace(suffix, '').strip()
+        # Handle "Last, First" format
+        last, comma, first = name.partition(',')
+        if comma and ',' not in first:
+            name = f"{first.strip()} {last.strip()}"
         
         return name
     
-    def query_wikidata(self, artist_name: str, birth_year: Optional[int] = None, 
-                      death_year: Optional[int] = None) -> Optional[Dict]:
+    @cached_lookup('wikidata')
+    async def query_wikidata(self, artist_name: str,
+                             birth_year: Optional[int] = None,
+                             death_year: Optional[int] = None) -> Optional[Dict]:
+        """
+        Query Wikidata for artist information including gender and nationality.
+        Returns None when there is no match or the request fails; only a
+        genuine "no match" is cached.
+        """
+        # Clean the name for the query
+        clean_name = self.clean_artist_name(artist_name)
+        
+        # Build SPARQL query
+        query = f"""
+        SELECT DISTINCT ?person ?personLabel ?gender ?genderLabel ?birthDate ?deathDate ?nationality ?nationalityLabel ?occupation ?occupationLabel
+        WHERE {{
+          ?person wdt:P31 wd:Q5 .  # Is a human
+          ?person rdfs:label "{escape_sparql_string(clean_name)}"@en .
+          
+          OPTIONAL {{ ?person wdt:P21 ?gender . }}
+          OPTIONAL {{ ?person wdt:P569 ?birthDate . }}
+          OPTIONAL {{ ?person wdt:P570 ?deathDate . }}
+          OPTIONAL {{ ?person wdt:P27 ?nationality . }}
+          OPTIONAL {{ ?person wdt:P106 ?occupation . }}
+          
+          # Filter for artists/creators
+          {{
+            ?person wdt:P106 wd:Q1028181 .  # painter
+          }} UNION {{
+            ?person wdt:P106 wd:Q1281618 .  # sculptor
+          }} UNION {{
+            ?person wdt:P106 wd:Q33231 .    # photographer
+          }} UNION {{
+            ?person wdt:P106 wd:Q483501 .   # artist
+          }} UNION {{
+            ?person wdt:P106 wd:Q15296811 . # draughtsperson
+          }}
+          
+          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en" . }}
+        }}
+        """
+        
+        # Add birth/death year filters if available
+        birth_year = _normalise_lookup_arg(birth_year)
+        death_year = _normalise_lookup_arg(death_year)
+        if birth_year:
+            query = query.replace(
+                "SERVICE wikibase:label", 
+                f"FILTER(YEAR(?birthDate) = {birth_year} || !BOUND(?birthDate))\n      SERVICE wikibase:label"
+            )
+        
+        if death_year:
+            query = query.replace(
+                "SERVICE wikibase:label",
+                f"FILTER(YEAR(?deathDate) = {death_year} || !BOUND(?deathDate))\n      SERVICE wikibase:label"
+            )
+        
+        # Execute query
+        data = await self._get_json(
+            self.wikidata_endpoint,
+            params={'query': query, 'format': 'json'}
+        )
+        
+        results = data.get('results', {}).get('bindings', [])
+        
+        if results:
+            # Return the first result
+            return self._parse_wikidata_binding(results[0])
+        
+        return None
+    
+    def _group_by_label(self, names: List[str]) -> Dict[str, List[str]]:
+        """
+        Group raw names by their cleaned label, dropping names that clean to
+        nothing, so that each label is only looked up once
+        """
+        names_by_label: Dict[str, List[str]] = {}
+        for name in names:
+            names_by_label.setdefault(self.clean_artist_name(name), []).append(name)
+        names_by_label.pop("", None)
+        return names_by_label
+    
+    async def query_wikidata_batch(self, names: List[str]) -> Dict[str, Optional[Dict]]:
         """
-        Query Wikidata for artist information including gender and nationality
+        Query Wikidata for many artists at once, sending one SPARQL query per
+        `batch_size` names instead of one per name. Returns results keyed by
+        the names passed in.
         """
+        names_by_label = self._group_by_label(names)
+        
+        # Serve what we can from the cache; keys match query_wikidata without year filters
+        label_results: Dict[str, Optional[Dict]] = {}
+        labels = []
+        for label in names_by_label:
+            if self.cache is not None:
+                hit, value = self.cache.get(self.cache.make_key('wikidata', label, None, None))
+                if hit:
+                    label_results[label] = value
+                    continue
+            labels.append(label)
+        
+        chunks = [labels[i:i + self.batch_size] for i in range(0, len(labels), self.batch_size)]
+        chunk_results = await asyncio.gather(
+            *(self._query_wikidata_chunk(chunk) for chunk in chunks)
+        )
+        chunk_results.append(label_results)
+        
+        results: Dict[str, Optional[Dict]] = {name: None for name in names}
+        for chunk_result in chunk_results:
+            for label, result in chunk_result.items():
+                for name in names_by_label[label]:
+                    results[name] = result
+        return results
+    
+    async def _query_wikidata_chunk(self, labels: List[str]) -> Dict[str, Optional[Dict]]:
+        """Run one VALUES-batched SPARQL query, falling back to per-name queries on failure"""
+        values = " ".join(f'"{escape_sparql_string(label)}"@en' for label in labels)
+        query = f"""
+        SELECT DISTINCT ?name ?person ?personLabel ?gender ?genderLabel ?birthDate ?deathDate ?nationality ?nationalityLabel ?occupation ?occupationLabel
+        WHERE {{
+          VALUES ?name {{ {values} }}
+          ?person wdt:P31 wd:Q5 .  # Is a human
+          ?person rdfs:label ?name .
+          
+          OPTIONAL {{ ?person wdt:P21 ?gender . }}
+          OPTIONAL {{ ?person wdt:P569 ?birthDate . }}
+          OPTIONAL {{ ?person wdt:P570 ?deathDate . }}
+          OPTIONAL {{ ?person wdt:P27 ?nationality . }}
+          OPTIONAL {{ ?person wdt:P106 ?occupation . }}
+          
+          # Filter for artists/creators
+          {{
+            ?person wdt:P106 wd:Q1028181 .  # painter
+          }} UNION {{
+            ?person wdt:P106 wd:Q1281618 .  # sculptor
+          }} UNION {{
+            ?person wdt:P106 wd:Q33231 .    # photographer
+          }} UNION {{
+            ?person wdt:P106 wd:Q483501 .   # artist
+          }} UNION {{
+            ?person wdt:P106 wd:Q15296811 . # draughtsperson
+          }}
+          
+          SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en" . }}
+        }}
+        """
+        
         try:
-            # Clean the name for the query
-            clean_name = self.clean_artist_name(artist_name)
-            
-            # Build SPARQL query
-            query = f"""
-            SELECT DISTINCT ?person ?personLabel ?gender ?genderLabel ?birthDate ?deathDate ?nationality ?nationalityLabel ?occupation ?occupationLabel
-            WHERE {{
-              ?person wdt:P31 wd:Q5 .  # Is a human
-              ?person rdfs:label "{clean_name}"@en .
-              
-              OPTIONAL {{ ?person wdt:P21 ?gender . }}
-              OPTIONAL {{ ?person wdt:P569 ?birthDate . }}
-              OPTIONAL {{ ?person wdt:P570 ?deathDate . }}
-              OPTIONAL {{ ?person wdt:P27 ?nationality . }}
-              OPTIONAL {{ ?person wdt:P106 ?occupation . }}
-              
-              # Filter for artists/creators
-              {{
-                ?person wdt:P106 wd:Q1028181 .  # painter
-              }} UNION {{
-                ?person wdt:P106 wd:Q1281618 .  # sculptor
-              }} UNION {{
-                ?person wdt:P106 wd:Q33231 .    # photographer
-              }} UNION {{
-                ?person wdt:P106 wd:Q483501 .   # artist
-              }} UNION {{
-                ?person wdt:P106 wd:Q15296811 . # draughtsperson
-              }}
-              
-              SERVICE wikibase:label {{ bd:serviceParam wikibase:language "en" . }}
-            }}
-            """
-            
-            # Add birth/death year filters if available
-            if birth_year:
-                query = query.replace(
-                    "SERVICE wikibase:label", 
-                    f"FILTER(YEAR(?birthDate) = {birth_year} || !BOUND(?birthDate))\n      SERVICE wikibase:label"
-                )
-            
-            if death_year:
-                query = query.replace(
-                    "SERVICE wikibase:label",
-                    f"FILTER(YEAR(?deathDate) = {death_year} || !BOUND(?deathDate))\n      SERVICE wikibase:label"
-                )
-            
-            # Execute query
-            response = requests.get(
+            data = await self._get_json(
                 self.wikidata_endpoint,
-                params={'query': query, 'format': 'json'},
-                headers={'User-Agent': 'MuseumDataEnrichment/1.0'}
+                params={'query': query, 'format': 'json'}
             )
-            
-            if response.status_code == 200:
-                data = response.json()
-                results = data.get('results', {}).get('bindings', [])
-                
-                if results:
-                    # Return the first result
-                    result = results[0]
-                    
-                    # Extract gender
-                    gender = 'Unknown'
-                    if 'gender' in result:
-                        gender_uri = result['gender']['value']
-                        gender_id = gender_uri.split('/')[-1]
-                        gender = self.gender_mappings.get(gender_id, 'Unknown')
-                    
-                    # Extract heritage/nationality
-                    heritage = 'Unknown'
-                    if 'nationality' in result:
-                        nationality_uri = result['nationality']['value']
-                        nationality_id = nationality_uri.split('/')[-1]
-                        heritage = self.heritage_mappings.get(nationality_id, 'Unknown')
-                    
-                    return {
-                        'wikidata_id': result['person']['value'].split('/')[-1],
-                        'gender': gender,
-                        'heritage': heritage,
-                        'birth_date': result.get('birthDate', {}).get('value'),
-                        'death_date': result.get('deathDate', {}).get('value'),
-                        'nationality_label': result.get('nationalityLabel', {}).get('value'),
-                        'confidence': 0.8  # High confidence for exact name match
-                    }
-                    
+            bindings = data.get('results', {}).get('bindings', [])
         except Exception as e:
-            logger.error(f"Error querying Wikidata for {artist_name}: {str(e)}")
+            logger.error(f"Error running Wikidata batch query: {str(e)}")
+            if not (isinstance(e, RequestFailed) and e.rejected):
+                # The service is down or rate-limiting us; per-name queries would only
+                # add load. Leave these names unresolved (and uncached)
+                return {}
+            
+            logger.warning(f"Batch query rejected for {len(labels)} names, retrying individually")
+            # query_wikidata caches its own successful results
+            singles = await asyncio.gather(
+                *(self.query_wikidata(label) for label in labels)
+            )
+            return dict(zip(labels, singles))
+        
+        # Keep the first binding for each name, as query_wikidata does
+        results: Dict[str, Optional[Dict]] = {label: None for label in labels}
+        for binding in bindings:
+            label = binding.get('name', {}).get('value')
+            if label in results and results[label] is None:
+                results[label] = self._parse_wikidata_binding(binding)
+        
+        # Only a successful response is cached, including names it had no match for
+        if self.cache is not None:
+            for label, result in results.items():
+                self.cache.set(self.cache.make_key('wikidata', label, None, None), result)
+        return results
+    
+    def _parse_wikidata_binding(self, result: Dict) -> Dict:
+        """
+        Convert a single SPARQL result binding into an enrichment record. Gender
+        and nationality are kept as Q-IDs; label_records maps them to labels.
+        """
+        return {
+            'wikidata_id': result['person']['value'].split('/')[-1],
+            'gender_id': result.get('gender', {}).get('value', '').split('/')[-1] or None,
+            'nationality_id': result.get('nationality', {}).get('value', '').split('/')[-1] or None,
+            'birth_date': result.get('birthDate', {}).get('value'),
+            'death_date': result.get('deathDate', {}).get('value'),
+            'nationality_label': result.get('nationalityLabel', {}).get('value'),
+            'confidence': 0.8  # High confidence for exact name match
+        }
+    
+    @cached_lookup('viaf')
+    async def query_viaf(self, artist_name: str) -> Optional[Dict]:
+        """
+        Query VIAF (Virtual International Authority File) for an authority record
+        matching the artist's personal name. Returns None when there is no
+        match or the request fails; only a genuine "no match" is cached.
+        """
+        clean_name = self.clean_artist_name(artist_name)
+        
+        data = await self._get_json(
+            self.viaf_endpoint,
+            params={
+                'query': f'local.personalNames all "{escape_cql_string(clean_name)}"',
+                'maximumRecords': 1,
+                'httpAccept': 'application/json'
+            }
+        )
+        
+        records = data.get('searchRetrieveResponse', {}).get('records', [])
+        
+        if records:
+            record = records[0].get('record', {}).get('recordData', {})
+            viaf_id = record.get('viafID')
+            if viaf_id:
+                return {
+                    'viaf_id': viaf_id,
+                    'viaf_uri': f"https://viaf.org/viaf/{quote(str(viaf_id))}",
+                    'confidence': 0.6  # Name search, not an exact label match
+                }
         
         return None
     
-    def query_viaf(self, artist_name: str) -> Optional[Dict]:
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """HTTP/2 client shared by all lookups, reusing pooled connections"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=True,
+                follow_redirects=True,
+                headers={'User-Agent': 'MuseumDataEnrichment/1.0'},
+                limits=httpx.Limits(max_connections=self.max_concurrency),
+                timeout=60
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the shared HTTP client; a new one is created on next use"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def _bind_throttle(self):
+        """Create the semaphore and rate limiter for the running event loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._throttle_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._rate_limiter = RateLimiter(self.max_requests_per_second, self.max_concurrency)
+            self._throttle_loop = loop
+            
+            # Pooled connections from a previous loop can't be reused either, so
+            # close that client before a new one is created for this loop
+            stale_client, self._client = self._client, None
+            if stale_client is not None:
+                try:
+                    await stale_client.aclose()
+                except Exception as e:
+                    logger.warning(f"Failed to close HTTP client from a previous event loop: {str(e)}")
+    
+    async def _get_json(self, url: str, params: Dict) -> Dict:
+        """
+        GET a JSON document, bounded by the semaphore and the rate limiter.
+        Timeouts, connection errors and 5xx responses are retried with
+        exponential backoff; a 429 pauses all requests for its Retry-After.
+        Raises RequestFailed if no successful response is received.
+        """
+        await self._bind_throttle()
+        timed_out = False
+        for attempt in range(self.max_retries + 1):
+            retry_delay = 2 ** attempt
+            try:
+                async with self._semaphore:
+                    await self._rate_limiter.acquire()
+                    response = await self.client.get(url, params=params)
+            except httpx.TransportError as e:
+                logger.warning(f"Request to {url} failed: {str(e)}")
+                timed_out = isinstance(e, httpx.ReadTimeout)
+            else:
+                timed_out = False
+                if response.status_code == 200:
+                    return response.json()
+                
+                logger.warning(f"{url} returned HTTP {response.status_code}")
+                if response.status_code == 429:
+                    retry_delay = self._retry_after(response)
+                    self._rate_limiter.pause(retry_delay)
+                elif response.status_code < 500:
+                    # Other client errors won't succeed on retry
+                    raise RequestFailed(f"{url} returned HTTP {response.status_code}", rejected=True)
+                elif 'TimeoutException' in response.text:
+                    # WDQS reports queries over its time budget as a 5xx; retrying won't help
+                    raise RequestFailed(f"{url} timed out running the query", rejected=True)
+            
+            if attempt < self.max_retries:
+                await asyncio.sleep(retry_delay)
+        
+        raise RequestFailed(f"Giving up on {url} after {self.max_retries + 1} attempts",
+                            rejected=timed_out)
+    
+    def _retry_after(self, response: httpx.Response) -> float:
+        """Seconds to wait after a 429, from its Retry-After header if present"""
+        try:
+            return float(response.headers['Retry-After'])
+        except (KeyError, ValueError):
+            return self.rate_limit_sleep_seconds
+    
+    def _build_record(self, artist_name: str, wikidata: Optional[Dict],
+                      viaf: Optional[Dict]) -> Dict:
+        """Merge Wikidata and VIAF lookups into one enrichment record"""
+        record = {'artist_name': artist_name, 'gender_id': None, 'nationality_id': None}
+        if wikidata:
+            record.update(wikidata)
+        if viaf:
+            record['viaf_id'] = viaf['viaf_id']
+        return record
+    
+    def label_records(self, records: pd.DataFrame) -> pd.DataFrame:
+        """Map gender and nationality Q-IDs to labels for a whole frame at once"""
+        records['gender'] = records['gender_id'].map(self.gender_mappings).fillna('Unknown')
+        records['heritage'] = records['nationality_id'].map(self.heritage_mappings).fillna('Unknown')
+        return records
+    
+    async def enrich_artists_async(self, names: List[str]) -> pd.DataFrame:
         """
-        Query VIAF (Virtual International Authority File)
\ No newline at end of file
+        Enrich a batch of artists concurrently over the shared HTTP client.
+        Returns one labelled row per name.
+        """
+        names_by_label = self._group_by_label(names)
+        labels = list(names_by_label)
+        wikidata, viaf_results = await asyncio.gather(
+            self.query_wikidata_batch(names),
+            asyncio.gather(*(self.query_viaf(label) for label in labels))
+        )
+        
+        viaf: Dict[str, Optional[Dict]] = {name: None for name in names}
+        for label, result in zip(labels, viaf_results):
+            for name in names_by_label[label]:
+                viaf[name] = result
+        
+        rows = [self._build_record(name, wikidata[name], viaf[name]) for name in names]
+        records = pd.DataFrame.from_records(
+            rows, columns=None if rows else ['artist_name', 'gender_id', 'nationality_id']
+        )
+        return self.label_records(records)
+    
+    def enrich_artists(self, names: List[str]) -> pd.DataFrame:
+        """Synchronous wrapper around enrich_artists_async"""
+        async def run():
+            # Pooled connections belong to this event loop, so close them with it
+            try:
+                return await self.enrich_artists_async(names)
+            finally:
+                await self.aclose()
+        
+        return asyncio.run(run())
+    
+    def enrich_dataframe(self, df: pd.DataFrame, name_column: str = 'artist_name') -> pd.DataFrame:
+        """
+        Enrich every distinct artist in `df` and join the results back on
+        `name_column`, adding gender and heritage columns
+        """
+        names = df[name_column].dropna().unique().tolist()
+        enriched = self.enrich_artists(names).rename(columns={'artist_name': name_column})
+        merged = df.merge(enriched, on=name_column, how='left')
+        
+        # Rows without a name weren't looked up, but are labelled like any other miss
+        merged[['gender', 'heritage']] = merged[['gender', 'heritage']].fillna('Unknown')
+        return merged
@@ -4,8 +4,14 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
+import pyarrow as pa
 from datetime import datetime, timedelta
-import io
+
+# Heritage regions counted as underrepresented in the KPIs and summary export
+UNDERREP_HERITAGE = frozenset({'African', 'Latin American', 'Indigenous', 'Middle Eastern'})
+
+# Filter selections kept per cache; older entries are evicted so memory stays bounded
+FILTER_CACHE_ENTRIES = 32
 
 # Set page configuration
 st.set_page_config(
@@ -44,7 +50,7 @@ st.markdown("""
 @st.cache_data
 def generate_sample_data():
     """Generate sample museum data for demonstration"""
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     
     # Sample artists and metadata
     artists = [
@@ -60,66 +66,167 @@ def generate_sample_data():
                        "Latin American", "Middle Eastern", "Indigenous", "Mixed Heritage"]
     departments = ["Painting", "Sculpture", "Photography", "Prints & Drawings", 
                   "Contemporary Art", "Decorative Arts"]
+    mediums = ["Oil on canvas", "Watercolor", "Bronze", 
+               "Photography", "Mixed media", "Lithograph"]
+    
+    # Heritage mapping (simplified)
+    heritage_map = {
+        "Mary Cassatt": "North American", "Pablo Picasso": "European",
+        "Frida Kahlo": "Latin American", "Vincent van Gogh": "European",
+        "Georgia O'Keeffe": "North American", "Claude Monet": "European",
+        "Yayoi Kusama": "East Asian", "Jean-Michel Basquiat": "African",
+        "Louise Bourgeois": "European", "Jackson Pollock": "North American",
+        "Kara Walker": "African", "Kehinde Wiley": "African",
+        "Amy Tan": "East Asian", "Ai Weiwei": "East Asian",
+        "Banksy": "European", "Kaws": "North American",
+        "Takashi Murakami": "East Asian", "Kerry James Marshall": "African",
+        "Cindy Sherman": "North American", "Jeff Koons": "North American"
+    }
     
     # Generate artwork data
     n_artworks = 500
-    data = []
     
-    for i in range(n_artworks):
-        artist = np.random.choice(artists)
-        
-        # Simulate realistic gender distribution (skewed historically)
-        if artist in ["Mary Cassatt", "Frida Kahlo", "Georgia O'Keeffe", "Yayoi Kusama", 
-                     "Louise Bourgeois", "Kara Walker", "Cindy Sherman"]:
-            gender = "Female"
-        elif artist in ["Banksy"]:
-            gender = "Unknown"
-        else:
-            gender = np.random.choice(["Male", "Female", "Non-Binary"], p=[0.7, 0.25, 0.05])
-        
-        # Heritage mapping (simplified)
-        heritage_map = {
-            "Mary Cassatt": "North American", "Pablo Picasso": "European",
-            "Frida Kahlo": "Latin American", "Vincent van Gogh": "European",
-            "Georgia O'Keeffe": "North American", "Claude Monet": "European",
-            "Yayoi Kusama": "East Asian", "Jean-Michel Basquiat": "African",
-            "Louise Bourgeois": "European", "Jackson Pollock": "North American",
-            "Kara Walker": "African", "Kehinde Wiley": "African",
-            "Amy Tan": "East Asian", "Ai Weiwei": "East Asian",
-            "Banksy": "European", "Kaws": "North American",
-            "Takashi Murakami": "East Asian", "Kerry James Marshall": "African",
-            "Cindy Sherman": "North American", "Jeff Koons": "North American"
-        }
-        
-        heritage = heritage_map.get(artist, np.random.choice(heritage_regions))
-        
-        # Generate acquisition date (weighted toward recent years)
-        start_date = datetime(1950, 1, 1)
-        end_date = datetime(2024, 12, 31)
-        
-        # Weight more recent acquisitions
-        years = np.arange(1950, 2025)
-        weights = np.exp((years - 1950) * 0.02)  # Exponential growth
-        year = np.random.choice(years, p=weights/weights.sum())
-        
-        acquisition_date = datetime(year, 
-                                  np.random.randint(1, 13), 
-                                  np.random.randint(1, 29))
-        
-        data.append({
-            'artwork_id': f"MA{i+1:04d}",
-            'title': f"Artwork {i+1}",
-            'artist_name': artist,
-            'year_created': np.random.randint(1850, 2024),
-            'acquisition_date': acquisition_date,
-            'department': np.random.choice(departments),
-            'medium': np.random.choice(["Oil on canvas", "Watercolor", "Bronze", 
-                                      "Photography", "Mixed media", "Lithograph"]),
-            'gender': gender,
-            'heritage': heritage
-        })
+    # Sample per-artwork attributes as whole arrays
+    artist_col = rng.choice(artists, size=n_artworks)
+    year_created = rng.integers(1850, 2024, size=n_artworks)
+    department_col = rng.choice(departments, size=n_artworks)
+    medium_col = rng.choice(mediums, size=n_artworks)
+    
+    # Generate acquisition dates (weighted toward recent years)
+    years = np.arange(1950, 2025)
+    weights = np.exp((years - 1950) * 0.02)  # Exponential growth
+    acquisition_dates = pd.to_datetime(pd.DataFrame({
+        'year': rng.choice(years, size=n_artworks, p=weights/weights.sum()),
+        'month': rng.integers(1, 13, size=n_artworks),
+        'day': rng.integers(1, 29, size=n_artworks)
+    }))
+    
+    # Simulate realistic gender distribution (skewed historically)
+    female_artists = ["Mary Cassatt", "Frida Kahlo", "Georgia O'Keeffe", "Yayoi Kusama", 
+                      "Louise Bourgeois", "Kara Walker", "Cindy Sherman"]
+    sampled_genders = rng.choice(["Male", "Female", "Non-Binary"], size=n_artworks, p=[0.7, 0.25, 0.05])
+    gender_col = np.where(np.isin(artist_col, female_artists), "Female",
+                          np.where(artist_col == "Banksy", "Unknown", sampled_genders))
+    
+    heritage_col = pd.Series(artist_col).map(heritage_map).fillna(
+        pd.Series(rng.choice(heritage_regions, size=n_artworks))
+    )
+    
+    artwork_numbers = range(1, n_artworks + 1)
+    df = pd.DataFrame({
+        'artwork_id': [f"MA{i:04d}" for i in artwork_numbers],
+        'title': [f"Artwork {i}" for i in artwork_numbers],
+        'artist_name': artist_col,
+        'year_created': year_created,
+        'acquisition_date': acquisition_dates,
+        'department': department_col,
+        'medium': medium_col,
+        'gender': gender_col,
+        'heritage': heritage_col
+    })
+    
+    # Low-cardinality columns as categoricals: smaller, and faster to filter and group
+    for column in ['gender', 'heritage', 'department', 'medium']:
+        df[column] = df[column].astype('category')
+    
+    # Casefolded search index, built once so searches don't re-fold every row
+    df['_search_blob'] = (df['artist_name'] + '\x1f' + df['title']).str.casefold()
     
-    return pd.DataFrame(data)
+    # Arrow-backed strings, integers and timestamps use Arrow compute kernels
+    # for filtering and string search; categorical columns are left as they are
+    df = df.convert_dtypes(dtype_backend='pyarrow')
+    df['acquisition_date'] = df['acquisition_date'].astype(pd.ArrowDtype(pa.timestamp('ns')))
+    
+    return df
+
+# Filtering and aggregation, cached per combination of filter selections
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def apply_filters(date_range, selected_departments, selected_genders, selected_heritage):
+    """Return the artworks matching the sidebar filter selections"""
+    df = generate_sample_data()
+    
+    # Combine every filter into one mask so the frame is indexed only once
+    mask = np.ones(len(df), dtype=bool)
+    
+    # Date filter
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+        # Compare raw datetime64 values; end_date is inclusive, so stop before the next day
+        acquisition_dates = df['acquisition_date'].to_numpy(dtype='datetime64[ns]')
+        mask &= ((acquisition_dates >= np.datetime64(start_date)) & 
+                 (acquisition_dates < np.datetime64(end_date) + np.timedelta64(1, 'D')))
+    
+    # Department filter
+    if 'All' not in selected_departments and selected_departments:
+        mask &= df['department'].isin(selected_departments).to_numpy()
+    
+    # Gender filter
+    if 'All' not in selected_genders and selected_genders:
+        mask &= df['gender'].isin(selected_genders).to_numpy()
+    
+    # Heritage filter
+    if 'All' not in selected_heritage and selected_heritage:
+        mask &= df['heritage'].isin(selected_heritage).to_numpy()
+    
+    return df[mask]
+
+@st.cache_data(max_entries=2 * FILTER_CACHE_ENTRIES)
+def count_values(filters, column):
+    """Value counts of one column of the filtered artworks"""
+    counts = apply_filters(*filters)[column].value_counts()
+    # Categorical columns also count categories that were filtered out
+    return counts[counts > 0]
+
+@st.cache_data
+def build_acquisition_cube():
+    """Artwork counts per acquisition year, department, gender and heritage"""
+    df = generate_sample_data()
+    return df.groupby([
+        df['acquisition_date'].dt.year.rename('year'), 'department', 'gender', 'heritage'
+    ], observed=True).size().reset_index(name='count')
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def yearly_gender_counts(filters):
+    """Filtered artworks counted per acquisition year and gender"""
+    date_range, selected_departments, selected_genders, selected_heritage = filters
+    cube = build_acquisition_cube()
+    
+    # Slice the pre-aggregated cube rather than regrouping the filtered rows
+    mask = pd.Series(True, index=cube.index)
+    if 'All' not in selected_departments and selected_departments:
+        mask &= cube['department'].isin(selected_departments)
+    if 'All' not in selected_genders and selected_genders:
+        mask &= cube['gender'].isin(selected_genders)
+    if 'All' not in selected_heritage and selected_heritage:
+        mask &= cube['heritage'].isin(selected_heritage)
+    
+    counts = [cube[mask]]
+    if len(date_range) == 2:
+        start_date, end_date = date_range
+        # Only whole years fit the cube; the first and last selected years may be
+        # partial, so count those from the filtered rows instead
+        mask &= (cube['year'] > start_date.year) & (cube['year'] < end_date.year)
+        filtered_df = apply_filters(*filters)
+        filtered_years = filtered_df['acquisition_date'].dt.year.rename('year')
+        edge_years = filtered_years.isin([start_date.year, end_date.year])
+        counts = [
+            cube[mask],
+            filtered_df[edge_years].groupby([filtered_years[edge_years], 'gender'], observed=True)
+                                   .size().reset_index(name='count')
+        ]
+    
+    return pd.concat(counts).groupby(['year', 'gender'], observed=True)['count'].sum().reset_index()
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def heritage_gender_crosstab(filters):
+    """Filtered artworks counted per heritage (rows) and gender (columns)"""
+    filtered_df = apply_filters(*filters)
+    return filtered_df.groupby(['heritage', 'gender'], observed=True).size().unstack(fill_value=0)
+
+@st.cache_data(max_entries=FILTER_CACHE_ENTRIES)
+def filtered_csv(filters):
+    """Filtered artworks encoded as CSV bytes for download"""
+    return apply_filters(*filters).drop(columns='_search_blob').to_csv(index=False).encode('utf-8')
 
 # Load data
 df = generate_sample_data()
@@ -165,50 +272,37 @@ selected_heritage = st.sidebar.multiselect(
     default=['All']
 )
 
-# Apply filters
-filtered_df = df.copy()
-
-# Date filter
-if len(date_range) == 2:
-    start_date, end_date = date_range
-    filtered_df = filtered_df[
-        (filtered_df['acquisition_date'].dt.date >= start_date) & 
-        (filtered_df['acquisition_date'].dt.date <= end_date)
-    ]
-
-# Department filter
-if 'All' not in selected_departments and selected_departments:
-    filtered_df = filtered_df[filtered_df['department'].isin(selected_departments)]
-
-# Gender filter
-if 'All' not in selected_genders and selected_genders:
-    filtered_df = filtered_df[filtered_df['gender'].isin(selected_genders)]
-
-# Heritage filter
-if 'All' not in selected_heritage and selected_heritage:
-    filtered_df = filtered_df[filtered_df['heritage'].isin(selected_heritage)]
+# Apply filters; cached results are keyed by the filter selections
+filters = (tuple(date_range), tuple(selected_departments),
+           tuple(selected_genders), tuple(selected_heritage))
+filtered_df = apply_filters(*filters)
 
 # KPI Cards
 st.markdown("## 📊 Key Performance Indicators")
 
 kpi_col1, kpi_col2, kpi_col3, kpi_col4 = st.columns(4)
 
+# Shared by the KPI cards, the charts and the summary export; derived from the
+# cached per-filter counts so no column is rescanned
+total_works = len(filtered_df)
+gender_counts = count_values(filters, 'gender')
+heritage_counts = count_values(filters, 'heritage')
+gender_share = gender_counts / max(total_works, 1) * 100
+underrep_counts = heritage_counts[heritage_counts.index.isin(UNDERREP_HERITAGE)]
+underrep_pct = underrep_counts.sum() / max(total_works, 1) * 100
+
 with kpi_col1:
     st.markdown('<div class="kpi-container">', unsafe_allow_html=True)
-    total_works = len(filtered_df)
     st.metric("Total Artworks", f"{total_works:,}")
     st.markdown('</div>', unsafe_allow_html=True)
 
 with kpi_col2:
     st.markdown('<div class="kpi-container">', unsafe_allow_html=True)
-    female_pct = (filtered_df['gender'] == 'Female').mean() * 100
-    st.metric("Female Artists", f"{female_pct:.1f}%")
+    st.metric("Female Artists", f"{gender_share.get('Female', 0):.1f}%")
     st.markdown('</div>', unsafe_allow_html=True)
 
 with kpi_col3:
     st.markdown('<div class="kpi-container">', unsafe_allow_html=True)
-    underrep_heritage = ['African', 'Latin American', 'Indigenous', 'Middle Eastern']
-    underrep_pct = filtered_df['heritage'].isin(underrep_heritage).mean() * 100
     st.metric("Underrepresented Heritage", f"{underrep_pct:.1f}%")
     st.markdown('</div>', unsafe_allow_html=True)
 
@@ -228,7 +322,6 @@ viz_col1, viz_col2 = st.columns(2)
 
 with viz_col1:
     st.markdown("### Gender Distribution")
-    gender_counts = filtered_df['gender'].value_counts()
     fig_gender = px.bar(
         x=gender_counts.index,
         y=gender_counts.values,
@@ -246,7 +339,6 @@ with viz_col1:
 
 with viz_col2:
     st.markdown("### Cultural Heritage Distribution")
-    heritage_counts = filtered_df['heritage'].value_counts()
     fig_heritage = px.pie(
         values=heritage_counts.values,
         names=heritage_counts.index,
@@ -261,13 +353,11 @@ viz_col3, viz_col4 = st.columns(2)
 with viz_col3:
     st.markdown("### Acquisition Trends by Gender")
     # Group by year and gender
-    yearly_gender = filtered_df.groupby([
-        filtered_df['acquisition_date'].dt.year, 'gender'
-    ]).size().reset_index(name='count')
+    yearly_gender = yearly_gender_counts(filters)
     
     fig_timeline = px.line(
         yearly_gender,
-        x='acquisition_date',
+        x='year',
         y='count',
         color='gender',
         title="Annual Acquisitions by Artist Gender",
@@ -284,7 +374,7 @@ with viz_col3:
 with viz_col4:
     st.markdown("### Gender × Heritage Intersection")
     # Create crosstab
-    crosstab = pd.crosstab(filtered_df['heritage'], filtered_df['gender'])
+    crosstab = heritage_gender_crosstab(filters)
     
     fig_heatmap = px.imshow(
         crosstab.values,
@@ -303,11 +393,10 @@ st.markdown("## 📋 Detailed Collection Data")
 search_term = st.text_input("🔍 Search by artist name or artwork title:", "")
 
 # Filter by search term
-display_df = filtered_df.copy()
+display_df = filtered_df
 if search_term:
     display_df = display_df[
-        display_df['artist_name'].str.contains(search_term, case=False, na=False) |
-        display_df['title'].str.contains(search_term, case=False, na=False)
+        display_df['_search_blob'].str.contains(search_term.casefold(), regex=False, na=False)
     ]
 
 # Select columns for display
@@ -327,11 +416,9 @@ export_col1, export_col2 = st.columns(2)
 
 with export_col1:
     # CSV export
-    csv_buffer = io.StringIO()
-    filtered_df.to_csv(csv_buffer, index=False)
     st.download_button(
         label="📥 Download Filtered Data (CSV)",
-        data=csv_buffer.getvalue(),
+        data=filtered_csv(filters),
         file_name=f"muscarelle_collection_data_{datetime.now().strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )
@@ -343,20 +430,18 @@ with export_col2:
                   'Non-Binary Artists (%)', 'Unknown Gender (%)',
                   'Underrepresented Heritage (%)'],
         'Value': [
-            len(filtered_df),
-            (filtered_df['gender'] == 'Female').mean() * 100,
-            (filtered_df['gender'] == 'Male').mean() * 100,
-            (filtered_df['gender'] == 'Non-Binary').mean() * 100,
-            (filtered_df['gender'] == 'Unknown').mean() * 100,
-            filtered_df['heritage'].isin(['African', 'Latin American', 'Indigenous', 'Middle Eastern']).mean() * 100
+            total_works,
+            gender_share.get('Female', 0),
+            gender_share.get('Male', 0),
+            gender_share.get('Non-Binary', 0),
+            gender_share.get('Unknown', 0),
+            underrep_pct
         ]
     })
     
-    summary_csv = io.StringIO()
-    summary_stats.to_csv(summary_csv, index=False)
     st.download_button(
         label="📊 Download Summary Statistics (CSV)",
-        data=summary_csv.getvalue(),
+        data=summary_stats.to_csv(index=False).encode('utf-8'),
         file_name=f"muscarelle_summary_stats_{datetime.now().strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )